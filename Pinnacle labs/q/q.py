@@ -1,13 +1,23 @@
 # app.py
 import streamlit as st
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+import contextlib
+import csv
 import hashlib
+import hmac
+import io
+import itertools
 import json
+import math
 import os
+import tempfile
 from dotenv import load_dotenv
 from bson import ObjectId
 import pandas as pd
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
 
 # -------------------------
 # Load .env file
@@ -16,27 +26,38 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI")
 SALT = os.getenv("SALT", "CHANGE_THIS_SALT")
+_SALT_BYTES = SALT.encode("utf-8")
 DB_NAME = os.getenv("DB_NAME")
 
 # -------------------------
 # DB helpers
 # -------------------------
+@st.cache_resource
 def get_db():
     if not MONGO_URI:
         st.error("MongoDB URI missing. Add it to your .env file.")
         st.stop()
 
-    client = MongoClient(MONGO_URI)
+    client = MongoClient(
+        MONGO_URI,
+        maxPoolSize=20,
+        minPoolSize=2,
+        serverSelectionTimeoutMS=3000,
+        socketTimeoutMS=10000,
+        retryWrites=True,
+        # wire compression: zstd needs the zstandard package, zlib is built in
+        compressors="zstd,zlib",
+    )
 
     # 1) If DB_NAME provided in .env -> use it
     if DB_NAME:
-        return client[DB_NAME]
+        return _ensure_indexes(client[DB_NAME])
 
     # 2) Try to use the default database embedded in the URI
     try:
         db = client.get_default_database()
         if db is not None:
-            return db
+            return _ensure_indexes(db)
     except Exception:
         pass
 
@@ -46,12 +67,52 @@ def get_db():
         f"No default DB found in URI and DB_NAME not set — using fallback database '{fallback}'."
         " To avoid this, include the DB in your MONGO_URI (e.g. .../quizdb) or set DB_NAME in .env."
     )
-    return client[fallback]
+    return _ensure_indexes(client[fallback])
+
+def _ensure_indexes(db):
+    """Create indexes matching the app's query shapes (no-op if they exist)."""
+    indexes = [
+        (db.questions, "course_code", {}),
+        (db.attempts, [("course_code", 1), ("timestamp", -1)], {}),
+        (db.attempts, [("course_code", 1), ("score", -1)], {}),
+        # last: fails if legacy data already holds duplicate usernames
+        (db.users, "username", {"unique": True}),
+    ]
+    for coll, keys, opts in indexes:
+        # one try per index so a failure doesn't skip the rest
+        try:
+            coll.create_index(keys, background=True, **opts)
+        except Exception:
+            pass
+    return db
 
 db = get_db()
 
+# Argon2id hasher; the encoded hash embeds its own salt and cost parameters
+_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
 def hash_password(password):
-    return hashlib.sha256((SALT + password).encode()).hexdigest()
+    return _hasher.hash(password)
+
+def _legacy_hash(password):
+    """SHA-256 + SALT hash used by accounts created before the Argon2 switch."""
+    h = hashlib.sha256()
+    h.update(_SALT_BYTES)
+    h.update(password.encode("utf-8"))
+    return h.hexdigest()
+
+def verify_password(stored_hash, password):
+    """Return (ok, needs_rehash) for a stored Argon2 or legacy SHA-256 hash."""
+    if not stored_hash:
+        return False, False
+    if not stored_hash.startswith("$argon2"):
+        ok = hmac.compare_digest(stored_hash, _legacy_hash(password))
+        return ok, ok
+    try:
+        _hasher.verify(stored_hash, password)
+    except (VerifyMismatchError, InvalidHashError):
+        return False, False
+    return True, _hasher.check_needs_rehash(stored_hash)
 
 # -------------------------
 # User Operations
@@ -61,19 +122,41 @@ def create_user(username, password, role):
     if users.find_one({"username": username}):
         return False, "Username already exists."
 
-    users.insert_one({
-        "username": username,
-        "password_hash": hash_password(password),
-        "role": role
-    })
+    try:
+        users.insert_one({
+            "username": username,
+            "password_hash": hash_password(password),
+            "role": role
+        })
+    except DuplicateKeyError:
+        # a concurrent signup won the race against the unique username index
+        return False, "Username already exists."
+    _cached_authenticate.clear()
     return True, "User created successfully."
 
-def authenticate(username, password):
+def _authenticate(username, password):
     users = db.users
     u = users.find_one({"username": username})
-    if u and u["password_hash"] == hash_password(password):
-        return {"username": u["username"], "role": u["role"]}
-    return None
+    if not u:
+        return None
+    ok, needs_rehash = verify_password(u.get("password_hash"), password)
+    if not ok:
+        return None
+    if needs_rehash:
+        # migrate legacy / outdated hashes lazily on successful login
+        users.update_one({"_id": u["_id"]}, {"$set": {"password_hash": hash_password(password)}})
+    return {"username": u["username"], "role": u["role"]}
+
+# Argon2 verification is deliberately slow, so reuse results across reruns.
+# Keyed on a digest of the password; the leading underscore keeps the
+# plaintext out of Streamlit's cache key.
+@st.cache_data(ttl=300, max_entries=512)
+def _cached_authenticate(username, password_digest, _password):
+    return _authenticate(username, _password)
+
+def authenticate(username, password):
+    digest = hashlib.sha256(password.encode()).hexdigest()
+    return _cached_authenticate(username, digest, password)
 
 # -------------------------
 # Questions Operations
@@ -86,9 +169,14 @@ def add_question(course_code, question, options, answer, marks):
         "answer": answer,
         "marks": marks
     })
+    _cached_questions.clear()
+
+@st.cache_data(ttl=30)
+def _cached_questions(course_code):
+    return list(db.questions.find({"course_code": course_code}))
 
 def get_questions(course_code):
-    return list(db.questions.find({"course_code": course_code.upper()}))
+    return _cached_questions(course_code.upper())
 
 def save_attempt(username, course, score, max_score, details):
     db.attempts.insert_one({
@@ -97,17 +185,102 @@ def save_attempt(username, course, score, max_score, details):
         "score": score,
         "max_score": max_score,
         "details": details,
-        "timestamp": datetime.utcnow().isoformat()
+        # stored as a native BSON date so it sorts and range-queries correctly
+        "timestamp": datetime.utcnow()
     })
 
 # -------------------------
 # Extra helper functions
 # -------------------------
 
+def _split_options(raw: str) -> tuple[str, ...]:
+    """Split a comma separated options string into a tuple of trimmed, non-empty options."""
+    return tuple(o.strip() for o in raw.split(",") if o.strip())
+
+
+# bounded: only the add/edit forms go through the cache, bulk imports split directly
+@st.cache_data(max_entries=128, ttl=600)
+def parse_options(raw: str) -> tuple[str, ...]:
+    return _split_options(raw)
+
+
+def add_questions_bulk(docs):
+    """Insert many question documents in one unordered insert_many; returns the count."""
+    if not docs:
+        return 0
+    res = db.questions.insert_many(
+        [{**d, "course_code": d["course_code"].upper()} for d in docs],
+        ordered=False,
+    )
+    _cached_questions.clear()
+    return len(res.inserted_ids)
+
+
+def parse_questions_upload(name, data):
+    """Parse an uploaded CSV/JSON file of questions.
+
+    Each record needs course_code, question, options (list, or comma separated
+    string), answer and optional marks. Returns (docs, errors).
+    """
+    if name.lower().endswith(".json"):
+        records = json.loads(data)
+        if not isinstance(records, list):
+            return [], ["JSON file must contain a list of question objects."]
+    else:
+        records = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+    docs, errors = [], []
+    for i, r in enumerate(records, start=1):
+        if not isinstance(r, dict):
+            errors.append(f"Row {i}: expected an object with question fields.")
+            continue
+        fields = {}
+        for f in ("course_code", "question", "answer"):
+            v = r.get(f)
+            fields[f] = v.strip() if isinstance(v, str) else None
+        options = r.get("options")
+        if isinstance(options, str):
+            options = list(_split_options(options))
+        elif isinstance(options, list) and all(isinstance(o, str) for o in options):
+            options = [o.strip() for o in options if o.strip()]
+        else:
+            options = None
+        if None in fields.values():
+            errors.append(f"Row {i}: course_code, question and answer must be text.")
+            continue
+        if options is None:
+            errors.append(f"Row {i}: options must be a list of text or a comma separated string.")
+            continue
+        if not all(fields.values()) or not options:
+            errors.append(f"Row {i}: missing fields.")
+            continue
+        if fields["answer"] not in options:
+            errors.append(f"Row {i}: correct answer must be one of the options.")
+            continue
+        marks = r.get("marks")
+        if marks is None or marks == "":
+            marks = 1.0
+        elif isinstance(marks, bool):
+            errors.append(f"Row {i}: invalid marks.")
+            continue
+        else:
+            try:
+                marks = float(marks)
+            except (TypeError, ValueError):
+                errors.append(f"Row {i}: invalid marks.")
+                continue
+            # float() accepts "nan"/"inf", which would poison every score total
+            if not math.isfinite(marks) or marks < 0:
+                errors.append(f"Row {i}: invalid marks.")
+                continue
+        docs.append({**fields, "options": options, "marks": marks})
+    return docs, errors
+
+
 def delete_question(qid):
     """Delete a question by its ObjectId string."""
     try:
         db.questions.delete_one({"_id": ObjectId(qid)})
+        _cached_questions.clear()
         return True
     except Exception:
         return False
@@ -127,56 +300,124 @@ def update_question(qid, course_code, question, options, answer, marks):
             }
         },
     )
+    _cached_questions.clear()
+
 
+EXPORT_FIELDS = ["username", "course_code", "score", "max_score", "timestamp", "details"]
+EXPORT_PROJECTION = {"_id": 0, **{f: 1 for f in EXPORT_FIELDS}}
 
+CSV_BATCH_SIZE = 10_000
+
+@contextlib.contextmanager
 def export_attempts_csv(course_code):
-    """Return CSV (string) of attempts for a course code."""
-    rows = list(db.attempts.find({"course_code": course_code.upper()}))
-    if not rows:
-        return None
-    # Normalize and flatten
-    out = []
-    for r in rows:
-        entry = {
-            "username": r.get("username"),
-            "course_code": r.get("course_code"),
-            "score": r.get("score"),
-            "max_score": r.get("max_score"),
-            "timestamp": r.get("timestamp"),
-        }
-        # add per-question details as JSON string
-        entry["details"] = json.dumps(r.get("details", {}))
-        out.append(entry)
-    df = pd.DataFrame(out)
-    return df.to_csv(index=False)
+    """Yield an open binary file holding the attempts CSV for a course code, or None if empty.
+
+    The CSV is written to a named temp file in batches and removed on exit.
+    """
+    cursor = db.attempts.find({"course_code": course_code.upper()}, EXPORT_PROJECTION)
+    first = next(cursor, None)
+    if first is None:
+        yield None
+        return
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter_attempts_csv(itertools.chain([first], cursor)):
+                out.write(chunk.encode("utf-8"))
+        with open(path, "rb") as f:
+            yield f
+    finally:
+        # also runs if the cursor fails mid-export, so no temp file is left behind
+        os.remove(path)
+
+
+# fields shown in the teacher Students Summary / Detailed Attempts tables
+SUMMARY_PROJECTION = {"username": 1, "score": 1, "max_score": 1, "timestamp": 1, "_id": 0}
+ATTEMPTS_PAGE_SIZE = 100
+
+def top_attempts_by(course_code, field, limit=ATTEMPTS_PAGE_SIZE):
+    """Return up to `limit` attempts for a course, sorted by `field` descending."""
+    cursor = db.attempts.find({"course_code": course_code.upper()}, SUMMARY_PROJECTION)
+    return list(cursor.sort(field, -1).limit(limit))
+
+
+def _with_parsed_timestamps(df):
+    """Normalise the timestamp column; older attempts stored it as an ISO string.
+
+    format="ISO8601" needs pandas >= 2.0 (pinned in requirements.txt).
+    """
+    if "timestamp" in df:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601", errors="coerce")
+    return df
+
+
+def iter_attempts_csv(rows, batch_size=CSV_BATCH_SIZE):
+    """Yield the attempts CSV in chunks of `batch_size` rows, header first."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        for r in batch:
+            row = {f: r.get(f) for f in EXPORT_FIELDS}
+            # add per-question details as JSON string
+            row["details"] = json.dumps(r.get("details", {}))
+            # BSON dates come back as datetimes; keep the ISO format older rows use
+            if isinstance(row["timestamp"], datetime):
+                row["timestamp"] = row["timestamp"].isoformat()
+            writer.writerow(row)
+        yield buf.getvalue()
+        if len(batch) < batch_size:
+            return
+        buf.seek(0)
+        buf.truncate(0)
 
 
 def question_stats(course_code):
     """Compute basic analytics: avg score, attempts count, per-question accuracy."""
-    attempts = list(db.attempts.find({"course_code": course_code.upper()}))
-    if not attempts:
+    pipeline = [
+        {"$match": {"course_code": course_code.upper()}},
+        {"$facet": {
+            "summary": [
+                {"$group": {"_id": None, "avg": {"$avg": {"$ifNull": ["$score", 0]}}, "n": {"$sum": 1}}},
+            ],
+            "per_question": [
+                # details is either the answers list itself or {"answers": [...]}
+                {"$project": {"answers": {"$cond": [
+                    {"$isArray": "$details"},
+                    "$details",
+                    {"$ifNull": ["$details.answers", []]},
+                ]}}},
+                {"$unwind": "$answers"},
+                {"$group": {
+                    "_id": "$answers.question",
+                    "correct": {"$sum": {"$cond": ["$answers.is_correct", 1, 0]}},
+                    "total": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]
+    result = next(db.attempts.aggregate(pipeline), None)
+    if not result or not result["summary"]:
         return None
-    avg = sum(a.get("score", 0) for a in attempts) / len(attempts)
-    counts = {}
-    for a in attempts:
-        details = a.get("details") or {}
-        answers = details.get("answers") if isinstance(details, dict) else None
-        if not answers and isinstance(details, list):
-            answers = details
-        if not answers:
-            continue
-        for ans in answers:
-            qtext = ans.get("question")
-            rec = counts.setdefault(qtext, {"correct": 0, "total": 0})
-            rec["total"] += 1
-            if ans.get("is_correct"):
-                rec["correct"] += 1
-    accuracy = {q: (v["correct"] / v["total"]) for q, v in counts.items() if v["total"] > 0}
-    return {"avg_score": avg, "attempts": len(attempts), "question_accuracy": accuracy}
+    summary = result["summary"][0]
+    accuracy = {q["_id"]: (q["correct"] / q["total"]) for q in result["per_question"] if q["total"] > 0}
+    return {"avg_score": summary["avg"], "attempts": summary["n"], "question_accuracy": accuracy}
 
 # -------------------------
 # Streamlit UI
 # -------------------------
+# per-question session keys used by the Manage Questions edit form
+EDIT_KEYS = (
+    "edit_course_{0}",
+    "edit_question_{0}",
+    "edit_options_{0}",
+    "edit_answer_{0}",
+    "edit_marks_{0}",
+    "edit_marks_input_{0}",
+)
+
 st.title("Quiz App (Student + Teacher)")
 
 if "user" not in st.session_state:
@@ -188,6 +429,7 @@ with st.sidebar:
         st.success(f"Logged in as {st.session_state.user['username']} ({st.session_state.user['role']})")
         if st.button("Logout"):
             st.session_state.user = None
+            _cached_authenticate.clear()
             st.rerun()
     else:
         mode = st.radio("Choose Mode", ["Login", "Signup"])
@@ -228,20 +470,34 @@ if user["role"] == "teacher":
     marks = st.number_input("Marks", value=1.0, key="teacher_add_marks")
 
     if st.button("Add Question", key="teacher_add_btn"):
-        options = [o.strip() for o in options_raw.split(",") if o.strip()]
+        options = parse_options(options_raw)
         if not course or not question or not options or not answer:
             st.error("Fill all fields before adding a question.")
         elif answer not in options:
             st.error("Correct answer MUST be one of the options.")
         else:
-            add_question(course, question, options, answer, marks)
+            add_question(course, question, list(options), answer, marks)
             st.success("Question added successfully!")
 
+    with st.expander("Bulk import questions (CSV / JSON)"):
+        st.caption("Fields: course_code, question, options (comma separated), answer, marks")
+        upload = st.file_uploader("Questions file", type=["csv", "json"], key="teacher_bulk_file")
+        if upload is not None and st.button("Import Questions", key="teacher_bulk_btn"):
+            try:
+                docs, errors = parse_questions_upload(upload.name, upload.getvalue())
+            except (ValueError, csv.Error) as e:
+                docs, errors = [], [f"Could not parse file: {e}"]
+            for err in errors:
+                st.error(err)
+            if docs:
+                n = add_questions_bulk(docs)
+                st.success(f"Imported {n} questions.")
+
     st.markdown("---")
     st.subheader("📝 Manage Questions")
     manage_course = st.text_input("Enter Course Code to manage/list questions", key="teacher_manage_course")
     if manage_course:
-        qs = list(db.questions.find({"course_code": manage_course.upper()}))
+        qs = get_questions(manage_course)
         if not qs:
             st.info("No questions for this course.")
         else:
@@ -277,15 +533,14 @@ if user["role"] == "teacher":
                         eanswer = st.text_input("Correct Answer", key=f"edit_answer_{qid}")
                         emarks = st.number_input("Marks", value=st.session_state.get(f"edit_marks_{qid}",1.0), key=f"edit_marks_input_{qid}")
                         if st.button("Save Changes", key=f"save_{qid}"):
-                            opts = [o.strip() for o in eoptions.split(",") if o.strip()]
+                            opts = parse_options(eoptions)
                             if eanswer not in opts:
                                 st.error("Correct answer must be one of the options.")
                             else:
-                                update_question(qid, ecourse, equestion, opts, eanswer, emarks)
+                                update_question(qid, ecourse, equestion, list(opts), eanswer, emarks)
                                 # clear edit keys
-                                for k in list(st.session_state.keys()):
-                                    if k.startswith(f"edit_") and k.endswith(f"_{qid}") or k == f"edit_marks_{qid}":
-                                        del st.session_state[k]
+                                for tmpl in EDIT_KEYS:
+                                    st.session_state.pop(tmpl.format(qid), None)
                                 st.success("Question updated.")
                                 st.rerun()
 
@@ -293,46 +548,28 @@ if user["role"] == "teacher":
     st.subheader("📥 Export Attempts / Basic Analytics")
     export_course = st.text_input("Course Code for export/analytics", key="teacher_export_course")
     if export_course:
-        csv_data = export_attempts_csv(export_course)
-        stats = question_stats(export_course)
+        export_course_u = export_course.upper()
+        stats = question_stats(export_course_u)
 
-        if csv_data:
-            st.download_button("Download Attempts CSV", data=csv_data, file_name=f"{export_course}_attempts.csv", mime="text/csv")
-        else:
-            st.info("No attempts to export for this course.")
-
-        # Show summary table of students and their scores
-        attempts_for_students = list(db.attempts.find({"course_code": export_course.upper()}))
-        if attempts_for_students:
-            students_rows = []
-            for a in attempts_for_students:
-                students_rows.append({
-                    "username": a.get("username"),
-                    "score": a.get("score"),
-                    "max_score": a.get("max_score"),
-                    "timestamp": a.get("timestamp"),
-                })
-            students_df = pd.DataFrame(students_rows)
-            if not students_df.empty:
-                students_df = students_df.sort_values(by=["score"], ascending=False)
-                st.subheader("Students Summary")
-                st.table(students_df)
-                # Also show detailed attempts (one row per attempt) and allow CSV download
-                st.subheader("Detailed Attempts")
-                attempts_rows = []
-                for a in attempts_for_students:
-                    attempts_rows.append({
-                        "username": a.get("username"),
-                        "score": a.get("score"),
-                        "max_score": a.get("max_score"),
-                        "timestamp": a.get("timestamp"),
-                    })
-                attempts_df = pd.DataFrame(attempts_rows)
-                if not attempts_df.empty:
-                    attempts_df = attempts_df.sort_values(by=["timestamp"], ascending=False)
-                    st.dataframe(attempts_df)
-                    csv_attempts = attempts_df.to_csv(index=False)
-                    st.download_button("Download detailed attempts CSV", data=csv_attempts, file_name=f"{export_course}_detailed_attempts.csv", mime="text/csv")
+        with export_attempts_csv(export_course_u) as csv_data:
+            if csv_data:
+                st.download_button("Download Attempts CSV", data=csv_data, file_name=f"{export_course}_attempts.csv", mime="text/csv")
+            else:
+                st.info("No attempts to export for this course.")
+
+        # Show summary table of students and their scores (sorted/limited by Mongo)
+        top_attempts = top_attempts_by(export_course_u, "score")
+        if top_attempts:
+            st.subheader("Students Summary")
+            st.caption(f"Showing the top {ATTEMPTS_PAGE_SIZE} attempts by score; use Download Attempts CSV for all of them.")
+            st.table(_with_parsed_timestamps(pd.DataFrame(top_attempts)))
+            # Also show detailed attempts (one row per attempt) and allow CSV download
+            st.subheader("Detailed Attempts")
+            st.caption(f"Showing the {ATTEMPTS_PAGE_SIZE} most recent attempts; use Download Attempts CSV for all of them.")
+            attempts_df = _with_parsed_timestamps(pd.DataFrame(top_attempts_by(export_course_u, "timestamp")))
+            st.dataframe(attempts_df)
+            csv_attempts = attempts_df.to_csv(index=False)
+            st.download_button("Download shown attempts CSV", data=csv_attempts, file_name=f"{export_course}_shown_attempts.csv", mime="text/csv")
 
         if stats:
             st.metric("Average Score", f"{stats['avg_score']:.2f}")
@@ -352,44 +589,59 @@ if user["role"] == "student":
     course = st.text_input("Course Code to Attempt")
 
     if course:
-        questions = get_questions(course)
-
-        if not questions:
+        course_u = course.upper()
+        # load the question set once per course and keep it for the quiz duration;
+        # an empty set is not kept, so questions added later show up on the next rerun
+        if st.session_state.get("quiz_course") != course_u:
+            questions = get_questions(course_u)
+            if questions:
+                st.session_state.quiz_questions = questions
+                st.session_state.quiz_course = course_u
+                st.session_state.quiz_max_score = sum(q["marks"] for q in questions)
+        else:
+            questions = st.session_state.quiz_questions
+
+        result = st.session_state.get("quiz_result")
+        if result and result["course"] == course_u:
+            # one finish saves one attempt; the form only returns on an explicit restart
+            st.success(f"Quiz Finished! Score: {result['score']}")
+            if st.button("Attempt again"):
+                st.session_state.quiz_result = None
+                st.rerun()
+        elif not questions:
             st.warning("No questions available for this course.")
         else:
-            if "index" not in st.session_state:
-                st.session_state.index = 0
-                st.session_state.score = 0
-                st.session_state.answers = []
-
-            q = questions[st.session_state.index]
-            st.subheader(f"Question {st.session_state.index + 1}/{len(questions)}")
-            st.write(q["question"])
-
-            choice = st.radio("Options", q["options"])
-
-            if st.button("Submit Answer"):
-                correct = choice == q["answer"]
-                if correct:
-                    st.session_state.score += q["marks"]
-
-                st.session_state.answers.append({
-                    "question": q["question"],
-                    "selected": choice,
-                    "correct": q["answer"],
-                    "is_correct": correct
-                })
-
-                if st.session_state.index + 1 < len(questions):
-                    st.session_state.index += 1
-                    st.rerun()
-                else:
-                    save_attempt(user["username"], course, st.session_state.score,
-                                 sum(q["marks"] for q in questions),
-                                 st.session_state.answers)
-                    st.success(f"Quiz Finished! Score: {st.session_state.score}")
-
-                    # Reset for next quiz
-                    st.session_state.index = 0
-                    st.session_state.score = 0
-                    st.session_state.answers = []
\ No newline at end of file
+            # render the whole quiz in one form so answering doesn't rerun the script
+            with st.form("quiz"):
+                choices = []
+                for i, q in enumerate(questions):
+                    st.subheader(f"Question {i + 1}/{len(questions)}")
+                    st.write(q["question"])
+                    choices.append(st.radio("Options", q["options"], key=f"quiz_{course_u}_{i}"))
+                finished = st.form_submit_button("Finish")
+
+            if finished:
+                score = 0
+                answers = []
+                for q, choice in zip(questions, choices):
+                    correct = choice == q["answer"]
+                    if correct:
+                        score += q["marks"]
+                    answers.append({
+                        "question": q["question"],
+                        "selected": choice,
+                        "correct": q["answer"],
+                        "is_correct": correct
+                    })
+
+                save_attempt(user["username"], course_u, score,
+                             st.session_state.quiz_max_score,
+                             answers)
+
+                # Reset for next quiz
+                st.session_state.quiz_result = {"course": course_u, "score": score}
+                # the quiz is over: reload the question set for the next attempt
+                st.session_state.quiz_course = None
+                for i in range(len(questions)):
+                    st.session_state.pop(f"quiz_{course_u}_{i}", None)
+                st.rerun()
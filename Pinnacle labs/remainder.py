@@ -9,9 +9,11 @@ This version adds:
 - Per-user reminders and calendar (each reminder stored with `user_id`).
 - Reminder queries / counts are scoped to the logged-in user.
 
-Dependencies: streamlit, pymongo, python-dotenv, (optional) werkzeug
+Dependencies: streamlit, pymongo, python-dotenv, zstandard, werkzeug or argon2-cffi
 """
 import os
+import hashlib
+import hmac
 import streamlit as st
 import calendar
 import datetime
@@ -27,27 +29,44 @@ DB_NAME = os.environ.get("MONGO_DB", "calendar_app")
 COLLECTION_NAME = os.environ.get("MONGO_COLLECTION", "reminders")
 USERS_COLLECTION = os.environ.get("MONGO_USERS_COLLECTION", "users")
 
-# Hashing helpers: prefer werkzeug, fallback to hashlib
+# Hashing helpers: prefer werkzeug, fallback to argon2
 try:
     from werkzeug.security import generate_password_hash, check_password_hash
     _USE_WERKZEUG = True
 except Exception:
-    import hashlib
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerifyMismatchError
     _USE_WERKZEUG = False
+    _hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+    _PW_SALT_BYTES = os.environ.get('PW_SALT', 'change_this_salt').encode('utf-8')
 
     def generate_password_hash(password: str) -> str:
-        # note: simple fallback; in production use bcrypt/werkzeug
-        salt = os.environ.get('PW_SALT', 'change_this_salt')
-        return hashlib.sha256((salt + password).encode('utf-8')).hexdigest()
+        return _hasher.hash(password)
 
     def check_password_hash(hashed: str, password: str) -> bool:
-        salt = os.environ.get('PW_SALT', 'change_this_salt')
-        return hashed == hashlib.sha256((salt + password).encode('utf-8')).hexdigest()
+        if not hashed.startswith("$argon2"):
+            # legacy salted SHA-256 hashes from the old fallback
+            h = hashlib.sha256()
+            h.update(_PW_SALT_BYTES)
+            h.update(password.encode('utf-8'))
+            return hmac.compare_digest(hashed, h.hexdigest())
+        try:
+            return _hasher.verify(hashed, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False
 
 # Helpers: DB connection cached for Streamlit
 @st.cache_resource
 def get_db():
-    client = MongoClient(MONGO_URI)
+    client = MongoClient(
+        MONGO_URI,
+        maxPoolSize=50,
+        serverSelectionTimeoutMS=3000,
+        socketTimeoutMS=10000,
+        retryWrites=True,
+        # wire compression: zstd needs the zstandard package, zlib is built in
+        compressors="zstd,zlib",
+    )
     db = client[DB_NAME]
     return db
 
@@ -85,16 +104,31 @@ def create_user(username, password):
     hashed = generate_password_hash(password)
     doc = {"username": username, "password": hashed, "created_at": datetime.datetime.utcnow()}
     res = users_coll.insert_one(doc)
+    _cached_authenticate_user.clear()
     return str(res.inserted_id), None
 
-def authenticate_user(username, password):
+def _authenticate_user(username, password):
     username = username.strip().lower()
     user = users_coll.find_one({"username": username})
     if not user:
         return None
-    if check_password_hash(user.get("password", ""), password):
-        return user
-    return None
+    hashed = user.get("password", "")
+    if not check_password_hash(hashed, password):
+        return None
+    if not _USE_WERKZEUG and not hashed.startswith("$argon2"):
+        # migrate legacy SHA-256 hashes lazily on successful login
+        users_coll.update_one({"_id": user["_id"]}, {"$set": {"password": generate_password_hash(password)}})
+    return {"_id": str(user.get("_id")), "username": user.get("username")}
+
+# cache verified logins so the slow hash check doesn't run on every rerun;
+# only a digest of the password is part of the cache key
+@st.cache_data(ttl=300, max_entries=512)
+def _cached_authenticate_user(username, password_digest, _password):
+    return _authenticate_user(username, _password)
+
+def authenticate_user(username, password):
+    digest = hashlib.sha256(password.encode('utf-8')).hexdigest()
+    return _cached_authenticate_user(username.strip().lower(), digest, password)
 
 # Streamlit session state defaults for calendar and auth
 if "year" not in st.session_state:
@@ -131,7 +165,7 @@ def next_month():
 def reminders_for_date(date_obj):
     key = date_obj.isoformat()
     user_id = st.session_state.user.get("_id")
-    docs = list(coll.find({"date": key, "user_id": user_id}))
+    docs = list(coll.find({"date": key, "user_id": user_id}, {"title": 1, "time": 1, "notes": 1}))
     docs.sort(key=lambda d: d.get("time") or "99:99")
     return docs
 
@@ -166,6 +200,7 @@ if st.session_state.user:
     with col_top[1]:
         if st.button("Logout"):
             st.session_state.user = None
+            _cached_authenticate_user.clear()
             st.rerun()
     with col_top[0]:
         st.markdown(f"<div style='text-align:left; font-size:14px;'>Logged in as **{user_display}**</div>", unsafe_allow_html=True)
@@ -236,6 +271,15 @@ with cal_col:
         with header_cols[i]:
             st.markdown(f"**{d}**")
 
+    # one query for every visible day instead of one count per day
+    try:
+        dates_with_reminders = set(coll.distinct("date", {
+            "user_id": st.session_state.user.get("_id"),
+            "date": {"$gte": month_days[0][0].isoformat(), "$lte": month_days[-1][-1].isoformat()},
+        }))
+    except Exception:
+        dates_with_reminders = set()
+
     for week in month_days:
         cols = st.columns(len(week))
         for i, day in enumerate(week):
@@ -243,12 +287,8 @@ with cal_col:
             key = day.isoformat()
             label = str(day.day)
             # mark if reminders exist for this user/date
-            try:
-                user_id = st.session_state.user.get("_id")
-                if coll.count_documents({"date": key, "user_id": user_id}) > 0:
-                    label += " •"
-            except Exception:
-                pass
+            if key in dates_with_reminders:
+                label += " •"
             btn_key = f"btn-{key}"
             if is_current:
                 if cols[i].button(label, key=btn_key):